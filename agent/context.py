@@ -0,0 +1,98 @@
+import hashlib
+import threading
+from collections import OrderedDict, deque
+from typing import List, Optional, Dict
+
+from .models import Study
+
+
+def format_study_block(index: int, study: Study) -> str:
+    """Serialize one study for chat context. `index` is the 1-based number used in citations."""
+    return "\n".join([
+        f"Study {index}: {study.title} ({study.source})",
+        f"Summary: {study.summary}",
+        f"Biomarkers: {study.biomarkers}",
+        f"Adverse Events: {study.adverse_events}",
+        f"Demographics: {study.demographics}",
+        f"Enrollment: {study.enrollment}",
+        f"Relevance Score: {study.relevance_score}",
+        "---",
+    ])
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English text)."""
+    return len(text) // 4 + 1
+
+
+def shard_blocks(blocks: List[str], token_budget: int) -> List[List[int]]:
+    """
+    Greedily pack consecutive study blocks into shards under `token_budget`.
+    Returns shards as lists of block indices; an oversized block gets a shard of its own.
+    """
+    shards, current, used = [], [], 0
+    for i, block in enumerate(blocks):
+        tokens = estimate_tokens(block)
+        if current and used + tokens > token_budget:
+            shards.append(current)
+            current, used = [], 0
+        current.append(i)
+        used += tokens
+    if current:
+        shards.append(current)
+    return shards
+
+
+class StudyContext:
+    """
+    Chat context for one result set, serialized once and reused for every turn.
+    Keeps a bounded window of recent turns so follow-up questions have history
+    without the prompt growing without limit.
+    """
+
+    def __init__(self, studies: List[Study], max_history_turns: int = 4):
+        self.studies = list(studies)
+        self.blocks = [format_study_block(i, study) for i, study in enumerate(self.studies, 1)]
+        self.text = "\n".join(self.blocks)
+        self.history = deque(maxlen=max_history_turns * 2) # user/assistant messages
+        self._shards: Dict[int, List[List[int]]] = {}
+
+    def shards(self, token_budget: int) -> List[List[int]]:
+        if token_budget not in self._shards:
+            self._shards[token_budget] = shard_blocks(self.blocks, token_budget)
+        return self._shards[token_budget]
+
+    def add_turn(self, question: str, answer: str) -> None:
+        self.history.append({"role": "user", "content": question})
+        self.history.append({"role": "assistant", "content": answer})
+
+
+class PartialAnswerCache:
+    """
+    Thread-safe LRU of per-shard partial answers, keyed on the shard text and the question.
+    Shards whose studies did not change (e.g. after an incremental refresh) are reused.
+    """
+
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(shard_text: str, question: str) -> str:
+        normalized = " ".join(question.lower().split())
+        return hashlib.sha256(f"{shard_text}\0{normalized}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key: str, value: str) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
@@ -1,7 +1,8 @@
 import os
 import logging
 import json
-from typing import List
+from datetime import date
+from typing import List, Dict, Optional
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from openai import OpenAI
@@ -12,26 +13,78 @@ from data_sources.pubmed import PubMedAPI
 from data_sources.nejm import NejmAPI
 from .models import Study
 from .scoring import RelevanceScorer
+from .results import ResultsTable
 from .formatter import ResulFormatter
+from .context import StudyContext, PartialAnswerCache
 
 load_dotenv()
 
+# Marker a map-step shard returns when it has nothing relevant
+NO_EVIDENCE = "NO_RELEVANT_EVIDENCE"
+
+# Chat prompts are kept static so they form a cacheable prefix; the question always goes last.
+CHAT_INSTRUCTIONS = """You are a research assistant answering questions about a specific set of clinical studies found by the user.
+
+Instructions:
+- Answer strictly based on the provided studies.
+- The context includes fields for 'Enrollment', 'Relevance Score', 'Biomarkers', etc. USE THEM.
+- If the answer isn't in the studies, say "The provided studies do not mention this."
+- Cite specific studies (e.g., "Study 1 mentions...") when applicable."""
+
+MAP_INSTRUCTIONS = f"""You are a research assistant reviewing part of a larger set of clinical studies found by the user.
+
+Instructions:
+- Extract only what these studies say that is relevant to the user's question, as concise bullet points.
+- Use the fields provided ('Enrollment', 'Relevance Score', 'Biomarkers', etc.).
+- Cite each point with its study number exactly as given (e.g., "Study 12").
+- If none of these studies are relevant, reply exactly: {NO_EVIDENCE}"""
+
+REWRITE_INSTRUCTIONS = """Rewrite the user's follow-up question about a set of clinical studies as a standalone question.
+
+Rules:
+- Resolve references to earlier turns (e.g., "it", "that drug", "those studies") using the conversation.
+- If the question already stands on its own, return it unchanged.
+- OUTPUT ONLY THE QUESTION. No quotes, no explanations."""
+
+REDUCE_INSTRUCTIONS = """You are a research assistant answering questions about a specific set of clinical studies found by the user.
+The studies were reviewed in groups; the user message contains the findings from each group, followed by the question.
+
+Instructions:
+- Combine the findings into a single, well-organized answer.
+- Answer strictly based on the findings; do not add outside knowledge.
+- Keep the study citations exactly as given (e.g., "Study 12 mentions...")."""
+
 class PharmaAgent:
-    def __init__(self):
-        self.ct_api = ClinicalTrialsAPI()
-        self.pubmed_api = PubMedAPI()
-        self.nejm_api = NejmAPI()
+    # Chat: beyond this much context a single prompt would truncate, so answer with map-reduce
+    SINGLE_PROMPT_CONTEXT_CHARS = 15000
+    SHARD_TOKEN_BUDGET = 2500
+    MAP_WORKERS = 8
+    REWRITE_HISTORY_CHARS = 600 # Per earlier message, when rewriting a follow-up question
+    # Records requested per source, keyed by source label; kept low for demo speed
+    SEARCH_LIMITS = {"ClinicalTrials.gov": 5, "PubMed": 3, "NEJM": 2}
+
+    def __init__(self, client=None, ct_api=None, pubmed_api=None, nejm_api=None):
+        """
+        Clients default to the live APIs; pass stand-ins (e.g. for load testing) to override them.
+        """
+        self.ct_api = ct_api or ClinicalTrialsAPI()
+        self.pubmed_api = pubmed_api or PubMedAPI()
+        self.nejm_api = nejm_api or NejmAPI()
         self.scorer = RelevanceScorer()
         self.formatter = ResulFormatter()
+        self.partial_answers = PartialAnswerCache()
         
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY not found in environment")
-        self.client = OpenAI(api_key=api_key)
+        if client is None:
+            api_key = os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                raise ValueError("OPENAI_API_KEY not found in environment")
+            client = OpenAI(api_key=api_key)
+        self.client = client
 
-    def search_and_analyze(self, query: str) -> str:
+    def search_and_analyze(self, query: str, top_k: Optional[int] = None) -> str:
         """
         Main entry point.
+        Returns studies ranked by relevance; `top_k` keeps only the best k.
         """
         # 0. Smart Query Extraction
         print(f"Original Query: {query}")
@@ -39,20 +92,38 @@ class PharmaAgent:
         print(f"Optimized Search Keywords: {optimized_query}\n")
         
         # 1. Fetch raw data in parallel using optimized query
+        raw_results = self.fetch_raw(optimized_query)
+
+        if not raw_results:
+            return self.formatter.format_no_results() + "\n\nTry refining your search terms (e.g., specific drug or condition)."
+
+        # 2. Analyze with LLM
+        processed_studies = self.analyze_all(raw_results, query)
+        
+        # 3-4. Score and select top-k
+        return self.rank(processed_studies, top_k)
+
+    def fetch_raw(self, optimized_query: str, since: Optional[date] = None,
+                  limits: Optional[Dict[str, int]] = None, raise_errors: bool = False) -> List[dict]:
+        """
+        Query all sources in parallel. With `since`, sources only return records added/updated after that date.
+        `limits` overrides SEARCH_LIMITS (records per source label).
+        With `raise_errors`, a failing source raises instead of contributing no records.
+        """
+        limits = {**self.SEARCH_LIMITS, **(limits or {})}
         raw_results = []
         with ThreadPoolExecutor(max_workers=3) as executor:
             futures = [
-                executor.submit(self.ct_api.search, optimized_query, limit=5),
-                executor.submit(self.pubmed_api.search, optimized_query, limit=3), # Keep limits low for demo speed
-                executor.submit(self.nejm_api.search, optimized_query, limit=2)
+                executor.submit(self.ct_api.search, optimized_query, limit=limits["ClinicalTrials.gov"], since=since, raise_errors=raise_errors),
+                executor.submit(self.pubmed_api.search, optimized_query, limit=limits["PubMed"], since=since, raise_errors=raise_errors),
+                executor.submit(self.nejm_api.search, optimized_query, limit=limits["NEJM"], since=since, raise_errors=raise_errors)
             ]
             for future in as_completed(futures):
                 raw_results.extend(future.result())
+        return raw_results
 
-        if not raw_results:
-            return self.formatter.format_no_results() + "\n\nTry refining your search terms (e.g., specific drug or condition)."
-
-        # 2. Analyze with LLM
+    def analyze_all(self, raw_results: List[dict], query: str) -> List[Study]:
+        """Run `_analyze_study` over raw records in parallel, dropping failures."""
         processed_studies = []
         # Process in parallel for speed
         with ThreadPoolExecutor(max_workers=5) as executor:
@@ -61,59 +132,127 @@ class PharmaAgent:
                 study = future.result()
                 if study:
                     processed_studies.append(study)
-        
-        # 3. Score
-        for study in processed_studies:
-            self.scorer.score(study)
-            
-        # 4. Sort by score
-        processed_studies.sort(key=lambda x: x.relevance_score, reverse=True)
-        
         return processed_studies
 
-    def answer_question(self, studies: List[Study], question: str) -> str:
+    def rank(self, studies: List[Study], top_k: Optional[int] = None) -> List[Study]:
+        # Score all studies in one vectorized pass
+        table = ResultsTable.from_studies(studies).score(self.scorer)
+            
+        # Select top-k by score (partial sort)
+        return table.to_studies(table.top_k(top_k))
+
+    def answer_question(self, studies: List[Study], question: str, mode: str = "auto",
+                        context: Optional[StudyContext] = None) -> str:
         """
         Answers a user question based on the context of the provided studies.
+        Pass the same `context` (a StudyContext for `studies`) on every turn of a chat so the
+        study context is serialized once and recent turns are carried as history.
+        `mode` is "single" (one prompt), "map_reduce" (per-shard answers + synthesis),
+        or "auto", which switches to map-reduce once the context no longer fits one prompt.
         """
         try:
-            # Build Context String
-            context_parts = []
-            for i, study in enumerate(studies, 1):
-                context_parts.append(f"Study {i}: {study.title} ({study.source})")
-                context_parts.append(f"Summary: {study.summary}")
-                context_parts.append(f"Biomarkers: {study.biomarkers}")
-                context_parts.append(f"Adverse Events: {study.adverse_events}")
-                context_parts.append(f"Demographics: {study.demographics}")
-                context_parts.append(f"Enrollment: {study.enrollment}")
-                context_parts.append(f"Relevance Score: {study.relevance_score}")
-                context_parts.append("---")
-            
-            context_str = "\n".join(context_parts)
-            print("--- DEBUG CHAT CONTEXT ---\n" + context_str + "\n--------------------------")
-            
-            prompt = f"""
-            You are a research assistant answering questions about a specific set of clinical studies found by the user.
-            
-            User Question: "{question}"
-            
-            Available Study Context:
-            {context_str[:15000]} # Limit context
-            
-             Instructions:
-            - Answer strictly based on the provided studies.
-            - The context includes fields for 'Enrollment', 'Relevance Score', 'Biomarkers', etc. USE THEM.
-            - If the answer isn't in the studies, say "The provided studies do not mention this."
-            - Cite specific studies (e.g., "Study 1 mentions...") when applicable.
-            """
-            
+            if context is None:
+                context = StudyContext(studies)
+
+            if mode == "map_reduce" or (mode == "auto" and len(context.text) > self.SINGLE_PROMPT_CONTEXT_CHARS):
+                answer = self._answer_map_reduce(context, question)
+            else:
+                # Static instructions + study context form a stable prefix across turns,
+                # so provider-side prompt caching applies; only history and the question vary.
+                system_prompt = f"""{CHAT_INSTRUCTIONS}
+
+Available Study Context:
+{context.text[:self.SINGLE_PROMPT_CONTEXT_CHARS]}"""
+                response = self.client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        *context.history,
+                        {"role": "user", "content": question},
+                    ],
+                    temperature=0.3
+                )
+                answer = response.choices[0].message.content
+
+            context.add_turn(question, answer)
+            return answer
+        except Exception as e:
+            return f"Error generating answer: {e}"
+
+    def _answer_map_reduce(self, context: StudyContext, question: str) -> str:
+        """
+        Map: answer the question over each shard of studies concurrently (cached per shard).
+        Reduce: synthesize the partial answers into one response, keeping "Study N" citations.
+        """
+        shards = context.shards(self.SHARD_TOKEN_BUDGET)
+        # Shards see (and are cached on) a standalone question, so a follow-up still hits
+        # the partial answers of an earlier turn; only the reduce step sees the conversation
+        map_question = self._standalone_question(context, question)
+        with ThreadPoolExecutor(max_workers=self.MAP_WORKERS) as executor:
+            partials = list(executor.map(lambda shard: self._answer_shard(context.blocks, shard, map_question), shards))
+
+        # Drop shards with nothing to contribute so the reduce prompt stays small
+        relevant = [(shard, answer) for shard, answer in zip(shards, partials) if NO_EVIDENCE not in answer]
+        if not relevant and not context.history:
+            return "The provided studies do not mention this."
+
+        # A follow-up may be answerable from the conversation alone, so let the reduce step decide
+        partials_str = "\n\n".join(
+            f"Findings from Studies {shard[0] + 1}-{shard[-1] + 1}:\n{answer}" for shard, answer in relevant
+        ) or "No group of studies reported relevant findings."
+        response = self.client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "system", "content": REDUCE_INSTRUCTIONS},
+                *context.history,
+                {"role": "user", "content": f"Findings ({len(context.blocks)} studies in total):\n{partials_str}\n\nQuestion: {question}"},
+            ],
+            temperature=0.3
+        )
+        return response.choices[0].message.content
+
+    def _standalone_question(self, context: StudyContext, question: str) -> str:
+        """
+        Rewrite a follow-up ("what about its side effects?") into a question that stands on its own,
+        so it does not depend on the conversation. First turns are returned unchanged.
+        """
+        if not context.history:
+            return question
+        turns = "\n".join(
+            f"{message['role'].capitalize()}: {message['content'][:self.REWRITE_HISTORY_CHARS]}" for message in context.history
+        )
+        try:
             response = self.client.chat.completions.create(
                 model="gpt-4o-mini",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.3
+                messages=[
+                    {"role": "system", "content": REWRITE_INSTRUCTIONS},
+                    {"role": "user", "content": f"Conversation so far:\n{turns}\n\nFollow-up question: {question}"},
+                ],
+                temperature=0
             )
-            return response.choices[0].message.content
+            return response.choices[0].message.content.strip() or question
         except Exception as e:
-            return f"Error generating answer: {e}"
+            logging.warning(f"Follow-up rewrite failed: {e}")
+            return question # Fallback to the question as asked
+
+    def _answer_shard(self, blocks: List[str], shard: List[int], question: str) -> str:
+        shard_text = "\n".join(blocks[i] for i in shard)
+        key = PartialAnswerCache.make_key(shard_text, question)
+        cached = self.partial_answers.get(key)
+        if cached is not None:
+            return cached
+
+        response = self.client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "system", "content": f"{MAP_INSTRUCTIONS}\n\nStudy Context:\n{shard_text}"},
+                {"role": "user", "content": question},
+            ],
+            temperature=0
+        )
+        answer = response.choices[0].message.content
+        self.partial_answers.put(key, answer)
+        return answer
 
     def _extract_keywords(self, user_query: str) -> str:
         """
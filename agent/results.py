@@ -0,0 +1,138 @@
+import json
+from typing import List, Optional, Iterator, Dict, Any, IO, Union
+
+import numpy as np
+
+from .models import Study
+from .scoring import RelevanceScorer
+
+# Study fields exported as plain string columns (raw_data is intentionally left out)
+TEXT_COLUMNS = [
+    "id", "source", "title", "url", "phase", "study_type", "status", "enrollment",
+    "demographics", "exposure", "endpoints", "biomarkers", "protein_data", "biology_note",
+    "adverse_events", "unexpected_aes", "summary", "next_steps",
+]
+FLAG_COLUMNS = ["has_biomarker_match", "has_unexpected_ae", "missing_data_penalty"]
+
+
+class ResultsTable:
+    """
+    Columnar view over a result set.
+    Scoring flags live in NumPy arrays so a whole batch is scored in one pass,
+    and rows can be streamed out to Parquet/JSONL without formatting markdown.
+    """
+
+    def __init__(self, studies: List[Study]):
+        self._studies = studies
+        self.flags = {
+            name: np.fromiter((bool(getattr(s, name)) for s in studies), dtype=bool, count=len(studies))
+            for name in FLAG_COLUMNS
+        }
+        self.scores = np.fromiter((s.relevance_score for s in studies), dtype=np.int16, count=len(studies))
+        self._justification_codes: Optional[np.ndarray] = None
+        self._justifications: List[str] = []
+
+    @classmethod
+    def from_studies(cls, studies: List[Study]) -> "ResultsTable":
+        return cls(list(studies))
+
+    def __len__(self) -> int:
+        return len(self._studies)
+
+    def score(self, scorer: RelevanceScorer) -> "ResultsTable":
+        """Score every row in one vectorized pass."""
+        self.scores, self._justification_codes = scorer.score_flags(
+            self.flags["has_biomarker_match"],
+            self.flags["has_unexpected_ae"],
+            self.flags["missing_data_penalty"],
+        )
+        self._justifications = scorer.justification_table()
+        return self
+
+    def justification(self, row: int) -> str:
+        if self._justification_codes is None:
+            return self._studies[row].score_justification
+        return self._justifications[self._justification_codes[row]]
+
+    def top_k(self, k: Optional[int] = None) -> np.ndarray:
+        """
+        Row indices of the k highest scores, best first, with ties in row order
+        (the same rows as the previous stable list sort).
+        Scores are integers, so (score desc, row asc) packs into one int64 key and a
+        partial sort selects the exact rows; only those k keys are then fully sorted.
+        """
+        n = len(self)
+        if k is not None and k <= 0:
+            return np.empty(0, dtype=np.intp)
+        keys = -self.scores.astype(np.int64) * n + np.arange(n, dtype=np.int64)
+        if k is None or k >= n:
+            return np.argsort(keys)
+        candidates = np.argpartition(keys, k - 1)[:k]
+        return candidates[np.argsort(keys[candidates])]
+
+    def to_studies(self, rows: Optional[np.ndarray] = None) -> List[Study]:
+        """Write scores back onto the Study objects and return them in row order."""
+        if rows is None:
+            rows = np.arange(len(self))
+        out = []
+        for row in rows.tolist():
+            study = self._studies[row]
+            study.relevance_score = int(self.scores[row])
+            study.score_justification = self.justification(row)
+            out.append(study)
+        return out
+
+    def iter_batches(self, batch_size: int = 10000, rows: Optional[np.ndarray] = None) -> Iterator[Dict[str, list]]:
+        """Yield column dicts of at most `batch_size` rows each."""
+        if rows is None:
+            rows = np.arange(len(self))
+        for start in range(0, len(rows), batch_size):
+            chunk = rows[start:start + batch_size]
+            studies = [self._studies[i] for i in chunk.tolist()]
+            batch = {name: [getattr(s, name) for s in studies] for name in TEXT_COLUMNS}
+            batch["publications"] = [list(s.publications) for s in studies]
+            for name in FLAG_COLUMNS:
+                batch[name] = self.flags[name][chunk].tolist()
+            batch["relevance_score"] = self.scores[chunk].tolist()
+            batch["score_justification"] = [self.justification(i) for i in chunk.tolist()]
+            yield batch
+
+    def iter_records(self, batch_size: int = 10000, rows: Optional[np.ndarray] = None) -> Iterator[Dict[str, Any]]:
+        for batch in self.iter_batches(batch_size, rows):
+            names = list(batch)
+            for values in zip(*(batch[n] for n in names)):
+                yield dict(zip(names, values))
+
+    def to_jsonl(self, dest: Union[str, IO[str]], batch_size: int = 10000, rows: Optional[np.ndarray] = None) -> int:
+        """Stream rows as JSON Lines. Returns the number of rows written."""
+        if isinstance(dest, str):
+            with open(dest, "w", encoding="utf-8") as fh:
+                return self.to_jsonl(fh, batch_size, rows)
+        count = 0
+        for record in self.iter_records(batch_size, rows):
+            dest.write(json.dumps(record, ensure_ascii=False))
+            dest.write("\n")
+            count += 1
+        return count
+
+    def to_parquet(self, path: str, batch_size: int = 10000, rows: Optional[np.ndarray] = None) -> int:
+        """Stream rows to a Parquet file one row group per batch. Requires pyarrow."""
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Parquet export requires pyarrow (pip install pyarrow)") from e
+
+        fields = [pa.field(name, pa.string()) for name in TEXT_COLUMNS]
+        fields.append(pa.field("publications", pa.list_(pa.string())))
+        fields += [pa.field(name, pa.bool_()) for name in FLAG_COLUMNS]
+        fields.append(pa.field("relevance_score", pa.int16()))
+        fields.append(pa.field("score_justification", pa.string()))
+        schema = pa.schema(fields)
+
+        count = 0
+        with pq.ParquetWriter(path, schema) as writer:
+            for batch in self.iter_batches(batch_size, rows):
+                writer.write_batch(pa.RecordBatch.from_pydict(batch, schema=schema))
+                count += len(batch["id"])
+        return count
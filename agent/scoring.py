@@ -1,6 +1,14 @@
+from typing import List
+
+import numpy as np
+
 from .models import Study
 
 class RelevanceScorer:
+    BIOMARKER_WEIGHT = 70
+    UNEXPECTED_AE_WEIGHT = 30
+    MISSING_DATA_PENALTY = 15
+
     def score(self, study: Study) -> None:
         """
         Apply scoring logic:
@@ -10,21 +18,50 @@ class RelevanceScorer:
         """
         score = 0
         justifications = []
-        
+
         if study.has_biomarker_match:
-            score += 70
-            justifications.append("Biomarker match (+70)")
-        
+            score += self.BIOMARKER_WEIGHT
+            justifications.append(f"Biomarker match (+{self.BIOMARKER_WEIGHT})")
+
         if study.has_unexpected_ae:
-            score += 30
-            justifications.append("Unexpected non-serious AE signal (+30)")
-            
+            score += self.UNEXPECTED_AE_WEIGHT
+            justifications.append(f"Unexpected non-serious AE signal (+{self.UNEXPECTED_AE_WEIGHT})")
+
         # Penalize if specifically missing key data (Biomarker OR AE data explicitly missing)
         # Note: "Not reported" is the default, so we check if it stays that way or if analysis confirms missing
         if study.missing_data_penalty:
-             score -= 15
-             justifications.append("Missing key biomarker/AE data (-15)")
-             
+             score -= self.MISSING_DATA_PENALTY
+             justifications.append(f"Missing key biomarker/AE data (-{self.MISSING_DATA_PENALTY})")
+
         # Clamp score 0-100
         study.relevance_score = max(0, min(100, score))
         study.score_justification = ", ".join(justifications) if justifications else "Baseline relevance"
+
+    def score_flags(self, biomarker: np.ndarray, unexpected_ae: np.ndarray, missing: np.ndarray):
+        """
+        Vectorized version of `score` over boolean flag columns.
+        Returns (scores, justification_codes) where each code indexes `justification_table()`.
+        """
+        scores = (
+            biomarker.astype(np.int16) * self.BIOMARKER_WEIGHT
+            + unexpected_ae.astype(np.int16) * self.UNEXPECTED_AE_WEIGHT
+            - missing.astype(np.int16) * self.MISSING_DATA_PENALTY
+        )
+        np.clip(scores, 0, 100, out=scores)
+        # Only 8 flag combinations exist, so justifications are looked up rather than built per row
+        codes = (biomarker.astype(np.uint8) << 2) | (unexpected_ae.astype(np.uint8) << 1) | missing.astype(np.uint8)
+        return scores, codes
+
+    def justification_table(self) -> List[str]:
+        """Justification strings for every flag combination, indexed by the codes from `score_flags`."""
+        table = []
+        for code in range(8):
+            probe = Study(
+                id="", source="", title="", url="", summary="",
+                has_biomarker_match=bool(code & 4),
+                has_unexpected_ae=bool(code & 2),
+                missing_data_penalty=bool(code & 1),
+            )
+            self.score(probe)
+            table.append(probe.score_justification)
+        return table
@@ -0,0 +1,124 @@
+import os
+import re
+import logging
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Optional, Tuple
+
+from pydantic import BaseModel
+
+from .models import Study
+
+DEFAULT_SAVED_QUERY_DIR = os.path.join(".pharma", "saved_queries")
+
+
+class SavedQuery(BaseModel):
+    name: str
+    query: str # Original natural language query (used for LLM analysis)
+    keywords: str # Optimized search keywords, extracted once on the first run
+    last_run: Optional[datetime] = None
+    studies: List[Study] = [] # Ranked result set
+    versions: Dict[str, Optional[str]] = {} # Study key -> source last-update date
+
+
+def study_key(source: str, record_id: str) -> str:
+    return f"{source}:{record_id}"
+
+
+class SavedQueryStore:
+    """One JSON file per saved query. Location comes from PHARMA_SAVED_QUERIES."""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or os.getenv("PHARMA_SAVED_QUERIES", DEFAULT_SAVED_QUERY_DIR)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, name: str) -> str:
+        slug = re.sub(r"[^A-Za-z0-9_-]+", "_", name).strip("_") or "query"
+        return os.path.join(self.directory, f"{slug}.json")
+
+    def load(self, name: str) -> Optional[SavedQuery]:
+        path = self._path(name)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as fh:
+            return SavedQuery.model_validate_json(fh.read())
+
+    def save(self, saved: SavedQuery) -> None:
+        path = self._path(saved.name)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            fh.write(saved.model_dump_json(indent=2))
+        os.replace(tmp, path)
+
+
+class QueryWatcher:
+    """
+    Incremental re-runs of saved queries.
+    Each refresh asks the sources only for records added/updated since the last run,
+    analyzes just the new or changed ones, and merges them into the stored ranked set.
+    """
+    # Source filters are day-granular; overlap by a day so same-day updates aren't missed.
+    # Re-fetched records whose version is unchanged are skipped before analysis.
+    OVERLAP = timedelta(days=1)
+    # Per-source caps for incremental fetches. Sources page through results up to the cap;
+    # a source that fills its cap may have more, so last_run is held back until a run drains it.
+    DELTA_LIMITS = {"ClinicalTrials.gov": 2000, "PubMed": 1000, "NEJM": 500}
+
+    def __init__(self, agent, store: Optional[SavedQueryStore] = None):
+        self.agent = agent
+        self.store = store or SavedQueryStore()
+
+    def refresh(self, name: str, query: Optional[str] = None) -> Tuple[List[Study], int]:
+        """
+        Run (or re-run) the saved query `name`, creating it from `query` on first use.
+        Returns the merged ranked studies and the number of records analyzed this run.
+        """
+        saved = self.store.load(name)
+        if saved is None:
+            if not query:
+                raise ValueError(f"No saved query named '{name}'; pass a query to create it")
+            saved = SavedQuery(name=name, query=query, keywords=self.agent._extract_keywords(query))
+
+        started = datetime.now(timezone.utc)
+        since = (saved.last_run - self.OVERLAP).date() if saved.last_run else None
+        # An incremental fetch must fail loudly: an empty result would otherwise advance
+        # last_run past updates that were never seen
+        raw_results = self.agent.fetch_raw(saved.keywords, since=since, limits=self.DELTA_LIMITS if since else None,
+                                           raise_errors=since is not None)
+        truncated = sorted(
+            source for source, count in Counter(raw.get("source") for raw in raw_results).items()
+            if since and count >= self.DELTA_LIMITS.get(source, float("inf"))
+        )
+
+        delta = []
+        for raw in raw_results:
+            key = study_key(raw.get("source"), raw.get("id"))
+            if key in saved.versions and saved.versions[key] == raw.get("last_update"):
+                continue # Already analyzed this version
+            delta.append(raw)
+        logging.info(f"Saved query '{name}': {len(raw_results)} fetched since {since}, {len(delta)} new or updated")
+
+        merged = {study_key(s.source, s.id): s for s in saved.studies}
+        analyzed = self.agent.analyze_all(delta, saved.query)
+        for study in analyzed:
+            key = study_key(study.source, study.id)
+            merged[key] = study
+            saved.versions[key] = (study.raw_data or {}).get("last_update")
+
+        # raw_data is only needed for analysis; keep the stored set compact
+        for study in merged.values():
+            study.raw_data = None
+
+        saved.studies = self.agent.rank(list(merged.values()))
+        # Keep the window open if anything was missed: the next run re-fetches from the same
+        # date, and records analyzed this time are skipped by version
+        if truncated:
+            logging.warning(f"Saved query '{name}': delta from {', '.join(truncated)} hit the fetch cap; "
+                            f"last run time not advanced")
+        elif len(analyzed) < len(delta):
+            logging.warning(f"Saved query '{name}': {len(delta) - len(analyzed)} records failed analysis; "
+                            f"last run time not advanced")
+        else:
+            saved.last_run = started
+        self.store.save(saved)
+        return saved.studies, len(delta)
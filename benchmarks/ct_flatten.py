@@ -0,0 +1,175 @@
+"""
+Benchmark: ClinicalTrials.gov record flattening, before vs. after the single-pass
+projection and flattened-record LRU, on a recorded 1,000-study /studies response.
+
+Usage:
+    python benchmarks/ct_flatten.py --record ct_1000.json   # fetch and save a response (needs network)
+    python benchmarks/ct_flatten.py --response ct_1000.json # benchmark a recorded response
+    python benchmarks/ct_flatten.py                         # fall back to a synthetic response
+"""
+import os
+import sys
+import gc
+import json
+import time
+import argparse
+import tracemalloc
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from data_sources.clinical_trials import ClinicalTrialsAPI
+
+
+def legacy_flatten(data):
+    """The per-record flattening used before the LRU, kept verbatim for comparison."""
+    results = []
+    for study in data.get('studies', []):
+        protocol = study.get('protocolSection', {})
+        derived = study.get('derivedSection', {})
+        ident = protocol.get('identificationModule', {})
+        status = protocol.get('statusModule', {})
+        design = protocol.get('designModule', {})
+        eligibility = protocol.get('eligibilityModule', {})
+        outcomes = protocol.get('outcomesModule', {})
+        references = protocol.get('referencesModule', {})
+        pmids = []
+        for ref in references.get('references', []):
+            if ref.get('pmid'):
+                pmids.append(str(ref['pmid']))
+            elif ref.get('citation') and 'PMID' in ref['citation']:
+                pass
+        results.append({
+            "source": "ClinicalTrials.gov",
+            "id": ident.get('nctId'),
+            "url": f"https://clinicaltrials.gov/study/{ident.get('nctId')}",
+            "title": ident.get('officialTitle') or ident.get('briefTitle'),
+            "status": status.get('overallStatus'),
+            "phases": design.get('phases', []),
+            "study_type": design.get('studyType'),
+            "enrollment": design.get('enrollmentInfo', {}).get('count'),
+            "conditions": [c for c in protocol.get('conditionsModule', {}).get('conditions', [])],
+            "interventions": [i.get('name') for i in protocol.get('armsInterventionsModule', {}).get('interventions', [])],
+            "summary": protocol.get('descriptionModule', {}).get('briefSummary'),
+            "eligibility_criteria": eligibility.get('eligibilityCriteria'),
+            "ages": eligibility.get('stdAges', []),
+            "age_range": f"{eligibility.get('minimumAge', 'N/A')} - {eligibility.get('maximumAge', 'N/A')}",
+            "sex": eligibility.get('sex', 'All'),
+            "primary_outcomes": [o.get('measure') for o in outcomes.get('primaryOutcomes', [])],
+            "publications": pmids,
+            "raw_data": study,
+        })
+    return results
+
+
+def record_response(path: str, size: int = 1000) -> None:
+    import requests
+    params = {
+        "query.term": "cancer",
+        "pageSize": size,
+        "fields": "NCTId,BriefTitle,OfficialTitle,Phase,Condition,InterventionName,StudyType,LeadSponsorName,BriefSummary,EnrollmentCount,EligibilityCriteria,OutcomeMeasure,EventGroup,ReferencesModule,StdAge,MinimumAge,MaximumAge,Sex,LastUpdatePostDate"
+    }
+    resp = requests.get(ClinicalTrialsAPI.BASE_URL, params=params, timeout=120)
+    resp.raise_for_status()
+    with open(path, "wb") as fh:
+        fh.write(resp.content)
+    print(f"Recorded {len(resp.json().get('studies', []))} studies to {path}")
+
+
+def synthetic_response(size: int = 1000) -> dict:
+    return {"studies": [
+        {"protocolSection": {
+            "identificationModule": {"nctId": f"NCT{i:08d}", "briefTitle": f"Study {i}", "officialTitle": f"Official title of study {i} " * 3},
+            "statusModule": {"overallStatus": "COMPLETED", "lastUpdatePostDateStruct": {"date": "2024-05-01"}},
+            "designModule": {"phases": ["PHASE2"], "studyType": "INTERVENTIONAL", "enrollmentInfo": {"count": 120}},
+            "conditionsModule": {"conditions": ["Depression", "Obesity"]},
+            "armsInterventionsModule": {"interventions": [{"name": "Semaglutide", "description": "x" * 400}, {"name": "Placebo"}]},
+            "descriptionModule": {"briefSummary": "Summary text. " * 60, "detailedDescription": "Detail. " * 300},
+            "eligibilityModule": {"eligibilityCriteria": "Inclusion: ... " * 80, "stdAges": ["ADULT"], "minimumAge": "18 Years", "maximumAge": "65 Years", "sex": "ALL"},
+            "outcomesModule": {"primaryOutcomes": [{"measure": "PHQ-9 change", "timeFrame": "12 weeks", "description": "d" * 200}]},
+            "referencesModule": {"references": [{"pmid": str(30000000 + i), "citation": "c" * 200}]},
+        }}
+        for i in range(size)
+    ]}
+
+
+def measure(fn, data, repeats: int, setup=None):
+    """
+    Per-record CPU time (best of `repeats`, GC paused as in timeit) and memory retained
+    by the flattened results. `setup` runs untimed before each repeat.
+    """
+    n = len(data.get("studies", []))
+    best = float("inf")
+    for _ in range(repeats):
+        if setup:
+            setup()
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.process_time()
+            fn(data)
+            best = min(best, time.process_time() - start)
+        finally:
+            gc.enable()
+
+    # Retained memory: flatten a private copy, then drop the response and keep only the results
+    encoded = json.dumps(data)
+    if setup:
+        setup()
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    payload = json.loads(encoded)
+    results = fn(payload)
+    del payload
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    del results
+    return best / n * 1e6, retained / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--response", help="Recorded /studies JSON response")
+    parser.add_argument("--record", metavar="PATH", help="Fetch a 1,000-study response and save it to PATH")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.record:
+        record_response(args.record)
+        return
+
+    if args.response:
+        with open(args.response, "rb") as fh:
+            data = json.loads(fh.read())
+        label = args.response
+    else:
+        data = synthetic_response()
+        label = "synthetic response"
+    print(f"{len(data.get('studies', []))} studies from {label}\n")
+
+    os.environ.setdefault("PHARMA_HTTP_CACHE", "off") # Parsing only; no HTTP cache needed
+    api = ClinicalTrialsAPI()
+
+    def clear_cache():
+        ClinicalTrialsAPI._flatten_cache.clear()
+
+    def parse(d):
+        return api._parse_studies(d)
+
+    api._parse_studies(data) # Populate the LRU for the warm run
+
+    print(f"{'variant':<28} | {'CPU / record':>14} | {'retained / record':>18}")
+    print("-" * 66)
+    variants = (
+        ("before (legacy flatten)", legacy_flatten, None),
+        ("after, cold LRU", parse, clear_cache),
+        ("after, warm LRU", parse, None),
+    )
+    for name, fn, setup in variants:
+        cpu_us, mem = measure(fn, data, args.repeats, setup)
+        print(f"{name:<28} | {cpu_us:>11.1f} us | {mem / 1024:>15.2f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+"""
+Load test: N concurrent simulated analysts sharing one PharmaAgent, as in the Streamlit
+deployment (`@st.cache_resource` agent, per-user `session_state`).
+
+Each user runs search_and_analyze, then asks follow-up questions via answer_question with
+think time in between. Data sources and OpenAI are replaced by local stand-ins with realistic
+latency: NCBI calls share a 3 req/s limiter and the LLM stand-in caps concurrent requests.
+Every stage reports throughput, latency percentiles, thread count and RSS over time.
+
+Usage:
+    python benchmarks/load_test.py --users 1 2 4 8 16 --duration 60
+    python benchmarks/load_test.py --latency-scale 0.1 --duration 10 --save-baseline load_baseline.json
+    python benchmarks/load_test.py --latency-scale 0.1 --duration 10 --baseline load_baseline.json  # regression gate
+
+The capacity is the largest user count whose p95 search and answer latencies are within the SLOs.
+With --baseline, the run exits non-zero if capacity drops or throughput at the baseline's
+capacity falls by more than --tolerance.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+import contextlib
+from types import SimpleNamespace
+from typing import List, Dict, Any, Optional
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("PHARMA_HTTP_CACHE", "off") # Measure the uncached path
+
+from agent.core import PharmaAgent
+from agent.context import StudyContext
+from data_sources.base import BaseDataSource
+from data_sources.pubmed import RateLimiter
+
+QUERIES = [
+    "GLP1 agonists depression",
+    "NSCLC KRAS G12C inhibitors biomarkers",
+    "lung cancer immunotherapy biomarkers",
+    "SGLT2 inhibitors heart failure",
+    "CAR-T cytokine release syndrome",
+]
+QUESTIONS = [
+    "Which studies report biomarker data?",
+    "What adverse events were seen?",
+    "Which study has the largest enrollment?",
+    "Summarize the demographics across studies.",
+]
+
+
+class Settings:
+    def __init__(self, scale: float, llm_concurrency: int, ncbi_rate: float):
+        self.scale = scale
+        self.llm_slots = threading.BoundedSemaphore(llm_concurrency)
+        # Scale the rate limit with latencies so scaled-down runs keep the same bottlenecks
+        self.ncbi = RateLimiter(ncbi_rate / scale)
+
+
+def sleep_latency(median: float, scale: float) -> None:
+    # Lognormal around the median gives the long tail real APIs have
+    time.sleep(median * scale * random.lognormvariate(0, 0.35))
+
+
+class FakeCompletions:
+    """Stand-in for `client.chat.completions` with prompt-size dependent latency and a concurrency cap."""
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.queue_waits: List[float] = []
+
+    def create(self, model: str, messages: List[Dict[str, str]], temperature: float = 0, response_format=None):
+        prompt_chars = sum(len(m["content"]) for m in messages)
+        waited = time.perf_counter()
+        with self.settings.llm_slots:
+            waited = time.perf_counter() - waited
+            with self._lock:
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+                self.queue_waits.append(waited)
+            try:
+                if response_format:
+                    sleep_latency(1.5, self.settings.scale)
+                    content = json.dumps({
+                        "summary": "Synthetic summary.",
+                        "enrollment": "120",
+                        "biomarkers": "HbA1c",
+                        "has_biomarker_match": random.random() < 0.5,
+                        "has_unexpected_ae": random.random() < 0.2,
+                        "missing_data_penalty": random.random() < 0.3,
+                    })
+                else:
+                    # ~0.4s fixed + time proportional to input tokens
+                    sleep_latency(0.4 + prompt_chars / 4 * 0.0002, self.settings.scale)
+                    content = "Study 1 mentions biomarkers."
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+class FakeSource(BaseDataSource):
+    """Stand-in data source returning synthetic records after a realistic delay."""
+
+    def __init__(self, source: str, median_latency: float, settings: Settings, ncbi_calls: int = 0):
+        super().__init__()
+        self.source = source
+        self.median_latency = median_latency
+        self.settings = settings
+        self.ncbi_calls = ncbi_calls # esearch + efetch for PubMed-backed sources
+
+    def search(self, query: str, limit: int = 5, since=None, raise_errors: bool = False) -> List[Dict[str, Any]]:
+        for _ in range(self.ncbi_calls):
+            self.settings.ncbi.wait()
+        sleep_latency(self.median_latency, self.settings.scale)
+        records = []
+        for i in range(limit):
+            record_id = f"{self.source[:3].upper()}{random.randint(0, 10**7)}"
+            record = {"source": self.source, "id": record_id, "url": "", "title": f"{query} study {i}",
+                      "summary": "Synthetic record. " * 20, "abstract": "Synthetic abstract. " * 40, "journal": "J"}
+            records.append(record)
+        return records
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        import resource
+        # ru_maxrss is the peak, not current, RSS (KiB on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+def simulated_user(agent: PharmaAgent, stop: threading.Event, results: Dict[str, list],
+                   lock: threading.Lock, questions: int, think_time: float) -> None:
+    session_state = {} # Mirrors st.session_state for one browser session
+    while not stop.is_set():
+        start = time.perf_counter()
+        studies = agent.search_and_analyze(random.choice(QUERIES))
+        elapsed = time.perf_counter() - start
+        with lock:
+            results["search"].append(elapsed)
+        session_state["studies"] = studies if isinstance(studies, list) else []
+        session_state["chat_context"] = StudyContext(session_state["studies"])
+
+        for _ in range(questions):
+            if stop.wait(think_time * random.uniform(0.5, 1.5)):
+                return
+            start = time.perf_counter()
+            agent.answer_question(session_state["studies"], random.choice(QUESTIONS), context=session_state["chat_context"])
+            elapsed = time.perf_counter() - start
+            with lock:
+                results["answer"].append(elapsed)
+        stop.wait(think_time * random.uniform(0.5, 1.5))
+
+
+def run_stage(users: int, args) -> Dict[str, Any]:
+    settings = Settings(args.latency_scale, args.llm_concurrency, args.ncbi_rate)
+    completions = FakeCompletions(settings)
+    agent = PharmaAgent(
+        client=SimpleNamespace(chat=SimpleNamespace(completions=completions)),
+        ct_api=FakeSource("ClinicalTrials.gov", 0.8, settings),
+        pubmed_api=FakeSource("PubMed", 0.6, settings, ncbi_calls=2),
+        nejm_api=FakeSource("NEJM", 0.6, settings, ncbi_calls=2),
+    )
+
+    results = {"search": [], "answer": []}
+    lock = threading.Lock()
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=simulated_user, args=(agent, stop, results, lock, args.questions, args.think_time * args.latency_scale), daemon=True)
+        for _ in range(users)
+    ]
+
+    timeline = []
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    while time.perf_counter() - started < args.duration:
+        time.sleep(args.sample_interval)
+        with lock:
+            done = len(results["search"]) + len(results["answer"])
+        timeline.append({
+            "t": round(time.perf_counter() - started, 2),
+            "threads": threading.active_count(),
+            "rss_mb": round(rss_mb(), 1),
+            "completed_ops": done,
+            "llm_in_flight": completions.in_flight,
+        })
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    ops = len(results["search"]) + len(results["answer"])
+    return {
+        "users": users,
+        "elapsed_s": round(elapsed, 2),
+        "searches": len(results["search"]),
+        "answers": len(results["answer"]),
+        "throughput_ops_s": round(ops / elapsed, 3),
+        "search_p50": percentile(results["search"], 50),
+        "search_p95": percentile(results["search"], 95),
+        "search_p99": percentile(results["search"], 99),
+        "answer_p50": percentile(results["answer"], 50),
+        "answer_p95": percentile(results["answer"], 95),
+        "answer_p99": percentile(results["answer"], 99),
+        "max_threads": max((s["threads"] for s in timeline), default=threading.active_count()),
+        "peak_rss_mb": max((s["rss_mb"] for s in timeline), default=rss_mb()),
+        "llm_max_in_flight": completions.max_in_flight,
+        "llm_queue_wait_p95": percentile(completions.queue_waits, 95),
+        "timeline": timeline,
+    }
+
+
+def fmt(seconds: Optional[float]) -> str:
+    return f"{seconds:.2f}s" if seconds is not None else "-"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 2, 4, 8, 16], help="Concurrent users per stage")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds per stage")
+    parser.add_argument("--questions", type=int, default=3, help="Follow-up questions per search")
+    parser.add_argument("--think-time", type=float, default=5, help="Median seconds between user actions (before scaling)")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiply all simulated latencies (e.g. 0.1 for CI)")
+    parser.add_argument("--llm-concurrency", type=int, default=16, help="Max concurrent OpenAI requests")
+    parser.add_argument("--ncbi-rate", type=float, default=3, help="NCBI requests/second")
+    parser.add_argument("--sample-interval", type=float, default=1.0)
+    parser.add_argument("--slo-search-p95", type=float, default=30, help="p95 search SLO in seconds (before scaling)")
+    parser.add_argument("--slo-answer-p95", type=float, default=10, help="p95 answer SLO in seconds (before scaling)")
+    parser.add_argument("--json", help="Write the full report (including timelines) to this file")
+    parser.add_argument("--baseline", help="Compare against a saved report and fail on regression")
+    parser.add_argument("--save-baseline", help="Save this run's report as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed throughput drop vs. baseline")
+    args = parser.parse_args()
+
+    slo_search = args.slo_search_p95 * args.latency_scale
+    slo_answer = args.slo_answer_p95 * args.latency_scale
+
+    stages = []
+    print(f"{'users':>5} | {'ops/s':>7} | {'search p50/p95/p99':>22} | {'answer p50/p95/p99':>22} | {'threads':>7} | {'RSS MB':>7} | {'LLM max':>7} | SLO")
+    print("-" * 110)
+    for users in args.users:
+        # The agent prints progress on every search; keep the report readable
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            stage = run_stage(users, args)
+        stage["within_slo"] = (
+            stage["search_p95"] is not None and stage["search_p95"] <= slo_search
+            and (stage["answer_p95"] is None or stage["answer_p95"] <= slo_answer)
+        )
+        stages.append(stage)
+        print(f"{users:>5} | {stage['throughput_ops_s']:>7.2f} | "
+              f"{fmt(stage['search_p50']):>6} / {fmt(stage['search_p95']):>6} / {fmt(stage['search_p99']):>6} | "
+              f"{fmt(stage['answer_p50']):>6} / {fmt(stage['answer_p95']):>6} / {fmt(stage['answer_p99']):>6} | "
+              f"{stage['max_threads']:>7} | {stage['peak_rss_mb']:>7.1f} | {stage['llm_max_in_flight']:>7} | "
+              f"{'ok' if stage['within_slo'] else 'MISS'}")
+
+    capacity = max((s["users"] for s in stages if s["within_slo"]), default=0)
+    print(f"\nCapacity: {capacity} concurrent users within SLO (search p95 <= {slo_search:.2f}s, answer p95 <= {slo_answer:.2f}s)")
+
+    report = {"capacity": capacity, "settings": vars(args), "stages": stages}
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(report, fh, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as fh:
+            json.dump(report, fh, indent=2)
+        print(f"Saved baseline to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)
+        failures = []
+        if capacity < baseline["capacity"]:
+            failures.append(f"capacity {capacity} < baseline {baseline['capacity']}")
+        base_stage = next((s for s in baseline["stages"] if s["users"] == baseline["capacity"]), None)
+        stage = next((s for s in stages if base_stage and s["users"] == base_stage["users"]), None)
+        if base_stage and stage:
+            floor = base_stage["throughput_ops_s"] * (1 - args.tolerance)
+            if stage["throughput_ops_s"] < floor:
+                failures.append(f"throughput at {stage['users']} users {stage['throughput_ops_s']:.2f} ops/s < {floor:.2f}")
+        if failures:
+            print("REGRESSION: " + "; ".join(failures))
+            sys.exit(1)
+        print("No regression against baseline.")
+
+
+if __name__ == "__main__":
+    main()
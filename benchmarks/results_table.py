@@ -0,0 +1,87 @@
+"""
+Benchmark: per-study scoring + full sort vs. ResultsTable vectorized scoring + top-k,
+plus streaming export, at 10k and 100k studies.
+
+Usage:
+    python benchmarks/results_table.py [--sizes 10000 100000] [--top-k 50]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from agent.models import Study
+from agent.scoring import RelevanceScorer
+from agent.results import ResultsTable
+
+
+def make_studies(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    return [
+        Study(
+            id=f"NCT{i:08d}",
+            source=rng.choice(["ClinicalTrials.gov", "PubMed", "NEJM"]),
+            title=f"Synthetic study {i}",
+            url=f"https://example.org/{i}",
+            summary="Synthetic summary for benchmarking.",
+            biomarkers="HbA1c, CRP",
+            publications=[str(rng.randint(10**7, 10**8)) for _ in range(rng.randint(0, 3))],
+            has_biomarker_match=rng.random() < 0.4,
+            has_unexpected_ae=rng.random() < 0.2,
+            missing_data_penalty=rng.random() < 0.3,
+        )
+        for i in range(n)
+    ]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def legacy_rank(studies, scorer):
+    for study in studies:
+        scorer.score(study)
+    return sorted(studies, key=lambda x: x.relevance_score, reverse=True)
+
+
+def table_rank(studies, scorer, k):
+    table = ResultsTable.from_studies(studies).score(scorer)
+    return table, table.to_studies(table.top_k(k))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--top-k", type=int, default=50)
+    args = parser.parse_args()
+
+    scorer = RelevanceScorer()
+    print(f"{'n':>8} | {'legacy score+sort':>18} | {'table score+top-k':>18} | {'jsonl export':>12} | {'parquet export':>14}")
+    print("-" * 84)
+    for n in args.sizes:
+        studies = make_studies(n)
+        legacy, t_legacy = timed(lambda: legacy_rank(studies, scorer))
+        (table, top), t_table = timed(lambda: table_rank(studies, scorer, args.top_k))
+
+        # Sanity check: same studies, in the same order, as the stable full sort
+        assert [s.id for s in top] == [s.id for s in legacy[:args.top_k]]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            _, t_jsonl = timed(lambda: table.to_jsonl(os.path.join(tmp, "results.jsonl")))
+            try:
+                _, t_parquet = timed(lambda: table.to_parquet(os.path.join(tmp, "results.parquet")))
+                parquet = f"{t_parquet * 1000:>11.1f} ms"
+            except ImportError:
+                parquet = f"{'n/a':>14}"
+
+        print(f"{n:>8} | {t_legacy * 1000:>15.1f} ms | {t_table * 1000:>15.1f} ms | {t_jsonl * 1000:>9.1f} ms | {parquet}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,33 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any
+from datetime import date
+from typing import List, Dict, Any, Optional
+
+import requests
+
+from .cache import HttpCache, get_default_cache
 
 class BaseDataSource(ABC):
+    def __init__(self, cache: Optional[HttpCache] = None):
+        # One pooled session per client keeps connections warm across searches
+        self.session = requests.Session()
+        self.cache = cache if cache is not None else get_default_cache()
+
     @abstractmethod
-    def search(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+    def search(self, query: str, limit: int = 5, since: Optional[date] = None,
+               raise_errors: bool = False) -> List[Dict[str, Any]]:
         """
         Search the data source for the query.
-        Returns a list of raw study/article dictionaries.
+        If `since` is given, only records added or updated on/after that date are returned.
+        Returns a list of raw study/article dictionaries. Errors are logged and yield an empty
+        list unless `raise_errors` is set, for callers that must tell "no results" from "failed".
         """
         pass
+
+    def _get(self, url: str, params: Dict[str, Any], ttl: float = 0, stale_ttl: float = 0, timeout: float = 15):
+        """
+        GET through the shared HTTP cache when the source allows it (ttl > 0),
+        otherwise straight to the network.
+        """
+        if self.cache is None or ttl <= 0:
+            return self.session.get(url, params=params, timeout=timeout)
+        return self.cache.get(self.session, url, params, ttl=ttl, stale_ttl=stale_ttl, timeout=timeout)
@@ -0,0 +1,230 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Optional, Dict, Any
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+
+DEFAULT_CACHE_PATH = os.path.join(".pharma", "http_cache.sqlite")
+
+
+class CachedResponse:
+    """Minimal stand-in for `requests.Response` served from the cache."""
+
+    def __init__(self, url: str, content: bytes, headers: Dict[str, str], from_cache: bool):
+        self.url = url
+        self.status_code = 200
+        self.content = content
+        self.headers = headers
+        self.from_cache = from_cache
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+    def raise_for_status(self) -> None:
+        pass
+
+
+class HttpCache:
+    """
+    On-disk (SQLite) cache for GET responses from the source APIs.
+
+    - Entries are keyed on the normalized URL plus sorted query params.
+    - Within `ttl` a stored response is served directly.
+    - Within `ttl + stale_ttl` it is served stale while a background request revalidates it.
+    - After that, a conditional request (If-None-Match / If-Modified-Since) is sent,
+      and a 304 refreshes the entry without downloading the body again.
+    - Entries older than `max_age_days` are purged, and once bodies exceed `max_bytes`
+      the least recently fetched entries are evicted; both run at startup and every
+      PRUNE_INTERVAL seconds on write.
+    """
+    PRUNE_INTERVAL = 600
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_age_days: float = 30, max_bytes: int = 256 * 1024 * 1024):
+        self.path = path
+        self.max_age = max_age_days * 86400
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._revalidating = set()
+        self._stats = {"requests": 0, "hits": 0, "stale_hits": 0, "revalidated": 0, "misses": 0, "bytes_saved": 0}
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    body BLOB NOT NULL,
+                    headers TEXT NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    fetched_at REAL NOT NULL
+                )
+            """)
+        self._prune()
+
+    def _prune(self) -> None:
+        self._next_prune = time.monotonic() + self.PRUNE_INTERVAL
+        with self._connect() as conn:
+            conn.execute("DELETE FROM responses WHERE fetched_at < ?", (time.time() - self.max_age,))
+            # Keep the most recently fetched entries whose bodies fit in max_bytes
+            evicted = conn.execute("""
+                DELETE FROM responses WHERE key IN (
+                    SELECT key FROM (
+                        SELECT key, SUM(LENGTH(body)) OVER (ORDER BY fetched_at DESC, key) AS total FROM responses
+                    ) WHERE total > ?
+                )
+            """, (self.max_bytes,)).rowcount
+        if evicted > 0:
+            logging.info(f"HTTP cache: evicted {evicted} entries to stay under {self.max_bytes / 1024 ** 2:.0f} MiB")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn: # Commits on success
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def make_key(url: str, params: Optional[Dict[str, Any]] = None) -> str:
+        parts = urlsplit(url)
+        normalized_url = urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip("/"), "", ""))
+        items = sorted((str(k), str(v)) for k, v in (params or {}).items() if v is not None)
+        return hashlib.sha256(json.dumps([normalized_url, items]).encode("utf-8")).hexdigest()
+
+    def get(self, session: requests.Session, url: str, params: Optional[Dict[str, Any]] = None,
+            ttl: float = 3600, stale_ttl: float = 0, timeout: float = 15):
+        """GET through the cache. Returns a CachedResponse, or the live response for non-200 replies."""
+        key = self.make_key(url, params)
+        entry = self._load(key)
+        self._count("requests")
+
+        if entry:
+            age = time.time() - entry["fetched_at"]
+            if age < ttl:
+                self._count("hits", len(entry["body"]))
+                return self._to_response(entry, from_cache=True)
+            if age < ttl + stale_ttl:
+                self._count("stale_hits", len(entry["body"]))
+                self._revalidate_in_background(session, key, url, params, entry, timeout)
+                return self._to_response(entry, from_cache=True)
+
+        return self._fetch(session, key, url, params, entry, timeout)
+
+    def _fetch(self, session, key, url, params, entry, timeout, count: bool = True):
+        headers = {}
+        if entry and entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+        resp = session.get(url, params=params, headers=headers, timeout=timeout)
+        if resp.status_code == 304 and entry:
+            self._touch(key)
+            if count:
+                self._count("revalidated", len(entry["body"]))
+            return self._to_response(entry, from_cache=True)
+
+        if count:
+            self._count("misses")
+        if resp.status_code == 200 and "no-store" not in resp.headers.get("Cache-Control", ""):
+            self._store(key, url, resp)
+        return resp
+
+    def _revalidate_in_background(self, session, key, url, params, entry, timeout):
+        with self._lock:
+            if key in self._revalidating:
+                return
+            self._revalidating.add(key)
+
+        def run():
+            try:
+                # The caller was already served stale content; don't count this request twice
+                self._fetch(session, key, url, params, entry, timeout, count=False)
+            except Exception as e:
+                logging.warning(f"Background revalidation failed for {url}: {e}")
+            finally:
+                with self._lock:
+                    self._revalidating.discard(key)
+
+        threading.Thread(target=run, name="http-cache-revalidate", daemon=True).start()
+
+    def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT url, body, headers, etag, last_modified, fetched_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        if not row:
+            return None
+        return dict(zip(("url", "body", "headers", "etag", "last_modified", "fetched_at"), row))
+
+    def _store(self, key: str, url: str, resp: requests.Response) -> None:
+        headers = {k: v for k, v in resp.headers.items() if k.lower() in ("content-type", "etag", "last-modified")}
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, url, body, headers, etag, last_modified, fetched_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, url, resp.content, json.dumps(headers), resp.headers.get("ETag"),
+                 resp.headers.get("Last-Modified"), time.time()),
+            )
+        if time.monotonic() >= self._next_prune:
+            self._prune()
+
+    def _touch(self, key: str) -> None:
+        with self._connect() as conn:
+            conn.execute("UPDATE responses SET fetched_at = ? WHERE key = ?", (time.time(), key))
+
+    @staticmethod
+    def _to_response(entry: Dict[str, Any], from_cache: bool) -> CachedResponse:
+        return CachedResponse(entry["url"], entry["body"], json.loads(entry["headers"]), from_cache)
+
+    def _count(self, name: str, bytes_saved: int = 0) -> None:
+        with self._lock:
+            self._stats[name] += 1
+            self._stats["bytes_saved"] += bytes_saved
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters since startup, including the hit ratio (fresh, stale and 304 responses)."""
+        with self._lock:
+            stats = dict(self._stats)
+        served = stats["hits"] + stats["stale_hits"] + stats["revalidated"]
+        stats["hit_ratio"] = served / stats["requests"] if stats["requests"] else 0.0
+        return stats
+
+    def format_stats(self) -> str:
+        s = self.stats()
+        return (f"HTTP cache: {s['hit_ratio']:.0%} hit ratio over {s['requests']} requests "
+                f"({s['hits']} fresh, {s['stale_hits']} stale, {s['revalidated']} revalidated), "
+                f"{s['bytes_saved'] / 1024:.1f} KiB saved")
+
+
+_default_cache: Optional[HttpCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache() -> Optional[HttpCache]:
+    """
+    Process-wide cache shared by all clients.
+    Location comes from PHARMA_HTTP_CACHE; set it to "off" to disable caching.
+    """
+    global _default_cache
+    path = os.getenv("PHARMA_HTTP_CACHE", DEFAULT_CACHE_PATH)
+    if path.lower() == "off":
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = HttpCache(path)
+        return _default_cache
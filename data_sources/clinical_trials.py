@@ -1,79 +1,116 @@
-import requests
 import logging
-from typing import List, Dict, Any
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import List, Dict, Any, Optional, Tuple
 from .base import BaseDataSource
 
 class ClinicalTrialsAPI(BaseDataSource):
     BASE_URL = "https://clinicaltrials.gov/api/v2/studies"
+    # Cache freshness (seconds): registry records change slowly, serve stale for a day while revalidating
+    CACHE_TTL = 6 * 3600
+    CACHE_STALE_TTL = 24 * 3600
+    MAX_PAGE_SIZE = 1000 # API v2 upper bound for pageSize
+    # Flattened records by NCT ID, stored with the last update date they were built from; shared across instances
+    FLATTEN_CACHE_SIZE = 4096
+    _flatten_cache: "OrderedDict[str, Tuple[str, Dict[str, Any]]]" = OrderedDict()
+    _flatten_lock = threading.Lock()
     
-    def search(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+    def search(self, query: str, limit: int = 5, since: Optional[date] = None,
+               raise_errors: bool = False) -> List[Dict[str, Any]]:
         """
-        Search ClinicalTrials.gov API v2.
+        Search ClinicalTrials.gov API v2, following nextPageToken until `limit` studies are collected.
+        `since` restricts results to studies whose last update was posted on/after that date.
+        Incremental (`since`) searches always go to the network: a cached page could predate
+        updates the caller is about to mark as seen.
         """
         params = {
             "query.term": query,
-            "pageSize": limit,
-            "fields": "NCTId,BriefTitle,OfficialTitle,Phase,Condition,InterventionName,StudyType,LeadSponsorName,BriefSummary,EnrollmentCount,EligibilityCriteria,OutcomeMeasure,EventGroup,ReferencesModule,StdAge,MinimumAge,MaximumAge,Sex"
+            "fields": "NCTId,BriefTitle,OfficialTitle,Phase,Condition,InterventionName,StudyType,LeadSponsorName,BriefSummary,EnrollmentCount,EligibilityCriteria,OutcomeMeasure,EventGroup,ReferencesModule,StdAge,MinimumAge,MaximumAge,Sex,LastUpdatePostDate"
         }
+        if since:
+            params["filter.advanced"] = f"AREA[LastUpdatePostDate]RANGE[{since.isoformat()},MAX]"
+        ttl, stale_ttl = (0, 0) if since else (self.CACHE_TTL, self.CACHE_STALE_TTL)
         
+        results = []
         try:
-            response = requests.get(self.BASE_URL, params=params, timeout=15)
-            response.raise_for_status()
-            data = response.json()
-            
-            studies = data.get('studies', [])
-            results = []
-            
-            for study in studies:
-                protocol = study.get('protocolSection', {})
-                derived = study.get('derivedSection', {})
-                
-                # Flatten crucial fields for easier processing later
-                ident = protocol.get('identificationModule', {})
-                status = protocol.get('statusModule', {})
-                design = protocol.get('designModule', {})
-                eligibility = protocol.get('eligibilityModule', {})
-                outcomes = protocol.get('outcomesModule', {})
-                references = protocol.get('referencesModule', {})
-                
-                # Extract PMIDs from references
-                pmids = []
-                for ref in references.get('references', []):
-                    if ref.get('pmid'):
-                        pmids.append(str(ref['pmid']))
-                    elif ref.get('citation') and 'PMID' in ref['citation']:
-                        # Simple heuristic if PMID not in structure but in text
-                        pass 
-
-                # Safe extraction
-                result = {
-                    "source": "ClinicalTrials.gov",
-                    "id": ident.get('nctId'),
-                    "url": f"https://clinicaltrials.gov/study/{ident.get('nctId')}",
-                    "title": ident.get('officialTitle') or ident.get('briefTitle'),
-                    "status": status.get('overallStatus'),
-                    "phases": design.get('phases', []),
-                    "study_type": design.get('studyType'),
-                    "enrollment": design.get('enrollmentInfo', {}).get('count'),
-                    "conditions": [c for c in protocol.get('conditionsModule', {}).get('conditions', [])],
-                    "interventions": [i.get('name') for i in protocol.get('armsInterventionsModule', {}).get('interventions', [])],
-                    "summary": protocol.get('descriptionModule', {}).get('briefSummary'),
-                    "eligibility_criteria": eligibility.get('eligibilityCriteria'),
-                    "ages": eligibility.get('stdAges', []),
-                    "age_range": f"{eligibility.get('minimumAge', 'N/A')} - {eligibility.get('maximumAge', 'N/A')}",
-                    "sex": eligibility.get('sex', 'All'),
-                    "primary_outcomes": [o.get('measure') for o in outcomes.get('primaryOutcomes', [])],
-                    "publications": pmids,
-                    # Adverse events are in a separate module often not populated in simple view, 
-                    # but we request 'EventGroup' if available. 
-                    # Note: API v2 structure for AEs is complex; we catch what we can.
-                    "raw_data": study # Keep raw for deep parsing if needed
-                }
-
-                results.append(result)
+            while len(results) < limit:
+                params["pageSize"] = min(limit - len(results), self.MAX_PAGE_SIZE)
+                response = self._get(self.BASE_URL, params, ttl=ttl, stale_ttl=stale_ttl)
+                response.raise_for_status()
+                data = response.json()
                 
+                results.extend(self._parse_studies(data))
+                if not data.get("nextPageToken") or not data.get("studies"):
+                    break
+                params["pageToken"] = data["nextPageToken"]
             return results
             
         except Exception as e:
+            if raise_errors:
+                raise
             logging.error(f"Error searching ClinicalTrials.gov: {e}")
             return []
+
+    def _parse_studies(self, data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Flatten a /studies response, reusing records already flattened for the same NCT ID and version.
+        Returned records are the cached objects themselves (lists included), not copies: treat them as read-only.
+        """
+        cache = ClinicalTrialsAPI._flatten_cache
+        lookup, flatten = cache.get, self._flatten
+        results = []
+        # One lock round-trip per response; lookups, flattening and inserts share a single pass
+        with ClinicalTrialsAPI._flatten_lock:
+            for study in data.get('studies', ()):
+                protocol = study.get('protocolSection') or {}
+                ident = protocol.get('identificationModule') or {}
+                nct_id = ident.get('nctId')
+                last_update = ((protocol.get('statusModule') or {}).get('lastUpdatePostDateStruct') or {}).get('date')
+                entry = lookup(nct_id)
+                if entry is not None and entry[0] == last_update:
+                    cache.move_to_end(nct_id)
+                    flat = entry[1]
+                else:
+                    flat = flatten(protocol, ident, nct_id, last_update)
+                    if nct_id and last_update:
+                        cache[nct_id] = (last_update, flat)
+                        if entry is not None: # Newer version of a cached study: replace it in place, mark it recent
+                            cache.move_to_end(nct_id)
+                results.append(flat)
+            while len(cache) > self.FLATTEN_CACHE_SIZE:
+                cache.popitem(last=False)
+        return results
+
+    @staticmethod
+    def _flatten(protocol: Dict[str, Any], ident: Dict[str, Any], nct_id: str, last_update: str) -> Dict[str, Any]:
+        """
+        Single pass over one study, keeping only the fields the agent consumes.
+        The unprojected study dict is not retained.
+        """
+        design = protocol.get('designModule') or {}
+        eligibility = protocol.get('eligibilityModule') or {}
+        references = (protocol.get('referencesModule') or {}).get('references') or ()
+        interventions = (protocol.get('armsInterventionsModule') or {}).get('interventions') or ()
+        outcomes = (protocol.get('outcomesModule') or {}).get('primaryOutcomes') or ()
+
+        return {
+            "source": "ClinicalTrials.gov",
+            "id": nct_id,
+            "url": f"https://clinicaltrials.gov/study/{nct_id}",
+            "title": ident.get('officialTitle') or ident.get('briefTitle'),
+            "last_update": last_update,
+            "phases": design.get('phases', []),
+            "study_type": design.get('studyType'),
+            "enrollment": (design.get('enrollmentInfo') or {}).get('count'),
+            # Lists from the parsed response are referenced, not copied
+            "conditions": (protocol.get('conditionsModule') or {}).get('conditions', []),
+            "interventions": [i.get('name') for i in interventions],
+            "summary": (protocol.get('descriptionModule') or {}).get('briefSummary'),
+            "eligibility_criteria": eligibility.get('eligibilityCriteria'),
+            "ages": eligibility.get('stdAges', []),
+            "age_range": f"{eligibility.get('minimumAge', 'N/A')} - {eligibility.get('maximumAge', 'N/A')}",
+            "sex": eligibility.get('sex', 'All'),
+            "primary_outcomes": [o.get('measure') for o in outcomes],
+            "publications": [str(ref['pmid']) for ref in references if ref.get('pmid')],
+        }
@@ -1,13 +1,15 @@
-from typing import List, Dict, Any
+from datetime import date
+from typing import List, Dict, Any, Optional
 from .pubmed import PubMedAPI
 
 class NejmAPI(PubMedAPI):
-    def search(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+    def search(self, query: str, limit: int = 5, since: Optional[date] = None,
+               raise_errors: bool = False) -> List[Dict[str, Any]]:
         """
         Search specifically in New England Journal of Medicine via PubMed.
         """
         nejm_query = f'{query} AND "New England Journal of Medicine"[Journal]'
-        results = super().search(nejm_query, limit)
+        results = super().search(nejm_query, limit, since=since, raise_errors=raise_errors)
         for res in results:
             res["source"] = "NEJM" # Override source label
             # NEJM often has DOIs that correspond to specific URLs, but PubMed URL is fine as fallback.
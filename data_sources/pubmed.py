@@ -1,17 +1,112 @@
-import requests
+import os
+import time
 import logging
-from typing import List, Dict, Any
+import threading
+from collections import deque
+from datetime import date
+from typing import List, Dict, Any, Optional, Iterator
+from concurrent.futures import ThreadPoolExecutor
+import requests
 from bs4 import BeautifulSoup
 from .base import BaseDataSource
 
+
+class RateLimiter:
+    """Thread-safe limiter that spaces calls evenly at `rate` per second."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def set_rate(self, rate: float) -> None:
+        with self._lock:
+            self.interval = 1.0 / rate
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class EutilsSession(requests.Session):
+    """
+    Session for NCBI E-utilities: every request waits on the shared rate limiter and carries
+    the API key, whichever path sends it (cache misses, revalidations or bulk pages).
+    """
+
+    def __init__(self, limiter: RateLimiter, api_key: Optional[str] = None):
+        super().__init__()
+        self.limiter = limiter
+        self.api_key = api_key
+
+    def request(self, method, url, params=None, **kwargs):
+        if self.api_key:
+            params = {**(params or {}), "api_key": self.api_key}
+        self.limiter.wait()
+        return super().request(method, url, params=params, **kwargs)
+
+
 class PubMedAPI(BaseDataSource):
     SEARCH_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
     FETCH_URL = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi"
+    # Cache freshness (seconds): search hits shift as new papers are indexed,
+    # while the record for a fixed set of PMIDs is effectively immutable
+    ESEARCH_TTL = 3600
+    ESEARCH_STALE_TTL = 6 * 3600
+    EFETCH_TTL = 30 * 86400
+    # Above this many results, search() switches to history-server bulk retrieval
+    BULK_THRESHOLD = 200
+    # NCBI allows 3 requests/second per client, 10 with an API key; shared by all instances
+    _rate_limiter: Optional[RateLimiter] = None
+    _rate_limiter_lock = threading.Lock()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.api_key = os.getenv("NCBI_API_KEY")
+        self.session = EutilsSession(self._shared_rate_limiter(), self.api_key)
+
+    @staticmethod
+    def host_rate() -> float:
+        """Requests/second this host may send: NCBI_RATE_LIMIT, else NCBI's per-client limit."""
+        return float(os.getenv("NCBI_RATE_LIMIT") or (10 if os.getenv("NCBI_API_KEY") else 3))
+
+    @classmethod
+    def _shared_rate_limiter(cls) -> RateLimiter:
+        with PubMedAPI._rate_limiter_lock:
+            if PubMedAPI._rate_limiter is None:
+                PubMedAPI._rate_limiter = RateLimiter(cls.host_rate())
+            return PubMedAPI._rate_limiter
+
+    @classmethod
+    def configure_rate_limit(cls, processes: int = 1) -> None:
+        """
+        Give this process its share of the host's NCBI budget when `processes` processes
+        (e.g. job service workers) query NCBI at once. Call before searching.
+        """
+        cls._shared_rate_limiter().set_rate(cls.host_rate() / max(processes, 1))
     
-    def search(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+    def search(self, query: str, limit: int = 5, since: Optional[date] = None,
+               raise_errors: bool = False) -> List[Dict[str, Any]]:
         """
         Search PubMed.
+        `since` restricts results to records added to PubMed (Entrez date) on/after that date;
+        such incremental searches skip the cache so a stale hit list can't hide new records.
+        Above BULK_THRESHOLD this delegates to `search_bulk` but still returns a full list;
+        callers that want to stream records in bounded memory should iterate `search_bulk` directly.
         """
+        if limit > self.BULK_THRESHOLD:
+            try:
+                return list(self.search_bulk(query, limit, since=since))
+            except Exception as e:
+                if raise_errors:
+                    raise
+                logging.error(f"Error searching PubMed: {e}")
+                return []
+
         # 1. Search for IDs
         search_params = {
             "db": "pubmed",
@@ -20,9 +115,12 @@ class PubMedAPI(BaseDataSource):
             "retmax": limit,
             "sort": "relevance"
         }
+        if since:
+            search_params.update(self._date_filter(since))
         
         try:
-            resp = requests.get(self.SEARCH_URL, params=search_params, timeout=15)
+            ttl, stale_ttl = (0, 0) if since else (self.ESEARCH_TTL, self.ESEARCH_STALE_TTL)
+            resp = self._get(self.SEARCH_URL, search_params, ttl=ttl, stale_ttl=stale_ttl)
             resp.raise_for_status()
             data = resp.json()
             ids = data.get("esearchresult", {}).get("idlist", [])
@@ -37,15 +135,89 @@ class PubMedAPI(BaseDataSource):
                 "retmode": "xml"
             }
             
-            fetch_resp = requests.get(self.FETCH_URL, params=fetch_params, timeout=15)
+            fetch_resp = self._get(self.FETCH_URL, fetch_params, ttl=self.EFETCH_TTL)
             fetch_resp.raise_for_status()
             
             return self._parse_xml_response(fetch_resp.content)
             
         except Exception as e:
+            if raise_errors:
+                raise
             logging.error(f"Error searching PubMed: {e}")
             return []
 
+    def search_bulk(self, query: str, limit: int, since: Optional[date] = None,
+                    chunk_size: int = 200, max_workers: int = 3) -> Iterator[Dict[str, Any]]:
+        """
+        High-volume retrieval through the E-utilities history server.
+        One esearch (usehistory=y) stores the hit list on NCBI's side; abstracts are then
+        pulled in `chunk_size` pages by WebEnv/query_key, up to `max_workers` at a time
+        within the NCBI rate limit. Each page is parsed as it lands and yielded in
+        relevance order, so at most `max_workers` pages are held in memory.
+        A page that still fails after retries raises, so a partial pull is never mistaken for a complete one.
+        """
+        search_params = {
+            "db": "pubmed",
+            "term": query,
+            "retmode": "json",
+            "retmax": 0,
+            "sort": "relevance",
+            "usehistory": "y",
+        }
+        if since:
+            search_params.update(self._date_filter(since))
+        data = self._eutils_get(self.SEARCH_URL, search_params).json().get("esearchresult", {})
+        total = min(int(data.get("count", 0)), limit)
+        if total == 0:
+            return
+        history = {"WebEnv": data["webenv"], "query_key": data["querykey"]}
+        logging.info(f"PubMed bulk retrieval: {total} records in chunks of {chunk_size}")
+
+        offsets = iter(range(0, total, chunk_size))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = deque()
+            for retstart in offsets:
+                pending.append(executor.submit(self._fetch_chunk, history, retstart, min(chunk_size, total - retstart)))
+                if len(pending) >= max_workers:
+                    break
+            while pending:
+                records = pending.popleft().result()
+                # Keep the window full before handing records to the caller
+                retstart = next(offsets, None)
+                if retstart is not None:
+                    pending.append(executor.submit(self._fetch_chunk, history, retstart, min(chunk_size, total - retstart)))
+                yield from records
+
+    def _fetch_chunk(self, history: Dict[str, str], retstart: int, retmax: int, attempts: int = 3) -> List[Dict[str, Any]]:
+        """
+        Fetch and parse one page, retrying the whole page on any error (timeouts and dropped
+        connections included). Raises once out of attempts rather than silently losing the page.
+        """
+        params = {"db": "pubmed", "retmode": "xml", "retstart": retstart, "retmax": retmax, **history}
+        for attempt in range(attempts):
+            try:
+                return self._parse_xml_response(self._eutils_get(self.FETCH_URL, params, timeout=60).content)
+            except Exception as e:
+                if attempt == attempts - 1:
+                    raise RuntimeError(f"PubMed records {retstart}-{retstart + retmax} could not be fetched: {e}") from e
+                logging.warning(f"Error fetching PubMed records {retstart}-{retstart + retmax}, retrying: {e}")
+                time.sleep(2 ** attempt)
+
+    def _eutils_get(self, url: str, params: Dict[str, Any], timeout: float = 15, retries: int = 3):
+        """Uncached E-utilities request with backoff on 429/5xx (rate-limited by the session)."""
+        for attempt in range(retries):
+            resp = self.session.get(url, params=params, timeout=timeout)
+            if resp.status_code != 429 and resp.status_code < 500:
+                break
+            time.sleep(2 ** attempt)
+        resp.raise_for_status()
+        return resp
+
+    @staticmethod
+    def _date_filter(since: date) -> Dict[str, str]:
+        # E-utilities need both ends of the range; maxdate far in the future means "until now"
+        return {"datetype": "edat", "mindate": since.strftime("%Y/%m/%d"), "maxdate": "3000"}
+
     def _parse_xml_response(self, xml_content: bytes) -> List[Dict[str, Any]]:
         soup = BeautifulSoup(xml_content, "xml")
         articles = []
@@ -2,18 +2,40 @@ import sys
 import argparse
 from dotenv import load_dotenv
 from agent.core import PharmaAgent
+from agent.results import ResultsTable
+from agent.watch import QueryWatcher
 
 def main():
     load_dotenv()
     
     parser = argparse.ArgumentParser(description="Pharma Discovery Agent CLI")
-    parser.add_argument("query", help="Research query string")
+    parser.add_argument("query", nargs="?", help="Research query string (optional when re-running a saved --watch query)")
+    parser.add_argument("--top-k", type=int, default=None, help="Keep only the k most relevant studies")
+    parser.add_argument("--export", help="Also write results to a .parquet or .jsonl file")
+    parser.add_argument("--watch", metavar="NAME", help="Save the query under NAME; re-runs only process new or updated records")
     args = parser.parse_args()
+    if not args.query and not args.watch:
+        parser.error("a query is required unless re-running a saved --watch query")
     
     try:
         agent = PharmaAgent()
-        print(f"Searching for: '{args.query}'...\n")
-        results = agent.search_and_analyze(args.query)
+        if args.watch:
+            print(f"Refreshing saved query '{args.watch}'...\n")
+            results, analyzed = QueryWatcher(agent).refresh(args.watch, args.query)
+            print(f"Analyzed {analyzed} new or updated records; {len(results)} studies in the saved set.\n")
+            if args.top_k is not None:
+                results = results[:args.top_k]
+        else:
+            print(f"Searching for: '{args.query}'...\n")
+            results = agent.search_and_analyze(args.query, top_k=args.top_k)
+        
+        if args.export and isinstance(results, list):
+            table = ResultsTable.from_studies(results)
+            if args.export.endswith(".parquet"):
+                count = table.to_parquet(args.export)
+            else:
+                count = table.to_jsonl(args.export)
+            print(f"Exported {count} studies to {args.export}\n")
         
         # Format results (since agent returns List[Study] now)
         output_parts = []
@@ -22,6 +44,9 @@ def main():
             output_parts.append("---")
             
         print("\n\n".join(output_parts))
+        
+        if agent.ct_api.cache:
+            print(agent.ct_api.cache.format_stats())
     except Exception as e:
         print(f"Error: {e}")
         sys.exit(1)
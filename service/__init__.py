@@ -0,0 +1,2 @@
+from .jobs import JobQueue, InMemoryQueue, SQLiteQueue, QueueFullError, create_queue
+from .client import ServiceClient
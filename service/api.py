@@ -0,0 +1,107 @@
+import json
+import time
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .jobs import JobQueue, QueueFullError, TERMINAL_STATUSES
+
+JOB_KINDS = ("search", "question")
+
+
+class JobRequestHandler(BaseHTTPRequestHandler):
+    """
+    Endpoints:
+    - POST /jobs              submit {"kind": "search", "query": ...} or
+                              {"kind": "question", "studies": [...], "question": ...}
+    - GET  /jobs/<id>         poll status and result
+    - GET  /jobs/<id>/stream  server-sent events until the job finishes
+    - GET  /health            queue depth by status
+    The tenant is taken from the X-Tenant header (default "default").
+    """
+    queue: JobQueue = None
+    stream_interval: float = 0.5
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/jobs":
+            return self._send_json(404, {"error": "Not found"})
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except (ValueError, json.JSONDecodeError):
+            return self._send_json(400, {"error": "Body must be JSON"})
+
+        kind = body.pop("kind", "search")
+        if kind not in JOB_KINDS:
+            return self._send_json(400, {"error": f"kind must be one of {JOB_KINDS}"})
+        if kind == "search" and not body.get("query"):
+            return self._send_json(400, {"error": "query is required"})
+        if kind == "question" and (not body.get("question") or not isinstance(body.get("studies"), list)):
+            return self._send_json(400, {"error": "question and studies are required"})
+
+        tenant = self.headers.get("X-Tenant", "default")
+        try:
+            job = self.queue.submit(tenant, kind, body)
+        except QueueFullError as e:
+            # Backpressure: tell clients to retry rather than growing the backlog
+            return self._send_json(429, {"error": f"Queue full: {e}"}, headers={"Retry-After": "5"})
+        return self._send_json(202, {"job_id": job.id, "status": job.status})
+
+    def do_GET(self):
+        parts = [p for p in self.path.split("?")[0].split("/") if p]
+        if parts == ["health"]:
+            return self._send_json(200, {"jobs": self.queue.stats()})
+        if len(parts) == 2 and parts[0] == "jobs":
+            job = self.queue.get(parts[1])
+            if not job:
+                return self._send_json(404, {"error": "Unknown job"})
+            return self._send_json(200, job.model_dump(exclude={"payload"}))
+        if len(parts) == 3 and parts[0] == "jobs" and parts[2] == "stream":
+            return self._stream(parts[1])
+        return self._send_json(404, {"error": "Not found"})
+
+    def _stream(self, job_id: str):
+        job = self.queue.get(job_id)
+        if not job:
+            return self._send_json(404, {"error": "Unknown job"})
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        last_status = None
+        try:
+            while True:
+                if job.status != last_status:
+                    last_status = job.status
+                    self._send_event("status", {"job_id": job.id, "status": job.status})
+                if job.status in TERMINAL_STATUSES:
+                    self._send_event("result", job.model_dump(exclude={"payload"}))
+                    return
+                time.sleep(self.stream_interval)
+                job = self.queue.get(job_id)
+        except (BrokenPipeError, ConnectionResetError):
+            logging.info(f"Stream client for job {job_id} disconnected")
+
+    def _send_event(self, event: str, data: dict):
+        self.wfile.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+    def _send_json(self, code: int, data: dict, headers: dict = None):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.info("%s - %s", self.address_string(), format % args)
+
+
+def create_server(queue: JobQueue, host: str = "127.0.0.1", port: int = 8000) -> ThreadingHTTPServer:
+    handler = type("BoundJobRequestHandler", (JobRequestHandler,), {"queue": queue})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
@@ -0,0 +1,75 @@
+import json
+import time
+from typing import List, Dict, Any, Iterator, Tuple, Optional
+
+import requests
+
+from agent.models import Study
+from agent.formatter import ResulFormatter
+from agent.context import StudyContext
+
+
+class ServiceError(Exception):
+    pass
+
+
+class ServiceClient:
+    """
+    Thin HTTP client for the job service.
+    Mirrors the PharmaAgent methods the UI uses, so it can stand in for a local agent.
+    """
+
+    def __init__(self, base_url: str, tenant: str = "default", timeout: float = 600):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.formatter = ResulFormatter()
+        self.session = requests.Session()
+        self.session.headers["X-Tenant"] = tenant
+
+    def submit(self, kind: str, **payload) -> str:
+        """Submit a job, retrying while the service applies backpressure. Returns the job id."""
+        deadline = time.time() + self.timeout
+        while True:
+            resp = self.session.post(f"{self.base_url}/jobs", json={"kind": kind, **payload}, timeout=15)
+            if resp.status_code != 429 or time.time() > deadline:
+                break
+            time.sleep(float(resp.headers.get("Retry-After", 5)))
+        if resp.status_code != 202:
+            raise ServiceError(f"Submit failed ({resp.status_code}): {resp.text}")
+        return resp.json()["job_id"]
+
+    def poll(self, job_id: str) -> Dict[str, Any]:
+        resp = self.session.get(f"{self.base_url}/jobs/{job_id}", timeout=15)
+        resp.raise_for_status()
+        return resp.json()
+
+    def stream(self, job_id: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield (event, data) pairs from the job's event stream until it finishes."""
+        with self.session.get(f"{self.base_url}/jobs/{job_id}/stream", stream=True, timeout=self.timeout) as resp:
+            resp.raise_for_status()
+            event = None
+            for line in resp.iter_lines(decode_unicode=True):
+                if line.startswith("event: "):
+                    event = line[len("event: "):]
+                elif line.startswith("data: "):
+                    yield event, json.loads(line[len("data: "):])
+
+    def wait(self, job_id: str) -> Dict[str, Any]:
+        for event, data in self.stream(job_id):
+            if event == "result":
+                if data["status"] != "done":
+                    raise ServiceError(data.get("error") or "Job failed")
+                return data["result"]
+        raise ServiceError(f"Stream for job {job_id} ended without a result")
+
+    def search_and_analyze(self, query: str, top_k: int = None) -> List[Study]:
+        result = self.wait(self.submit("search", query=query, top_k=top_k))
+        return [Study(**s) for s in result["studies"]]
+
+    def answer_question(self, studies: List[Study], question: str, context: Optional[StudyContext] = None) -> str:
+        payload = [s.model_dump(exclude={"raw_data"}) for s in studies]
+        history = list(context.history) if context else []
+        result = self.wait(self.submit("question", studies=payload, question=question, history=history))
+        if context:
+            context.add_turn(question, result["answer"])
+        return result["answer"]
@@ -0,0 +1,219 @@
+import os
+import json
+import time
+import hashlib
+import socket
+import logging
+import threading
+import multiprocessing
+from typing import List, Dict, Any, Optional
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, Future
+from concurrent.futures.process import BrokenProcessPool
+
+from dotenv import load_dotenv
+
+from agent.core import PharmaAgent
+from agent.models import Study
+from agent.context import StudyContext
+from data_sources.pubmed import PubMedAPI
+from .jobs import JobQueue, Job
+
+# One agent per worker process, created once by the pool initializer so its
+# HTTP sessions and OpenAI client stay warm across jobs.
+_agent: Optional[PharmaAgent] = None
+# Serialized chat contexts by result-set fingerprint, so follow-up questions on the
+# same studies skip re-serialization. Each process runs one job at a time.
+_contexts: "OrderedDict[str, StudyContext]" = OrderedDict()
+MAX_CONTEXTS = 32
+
+
+def _init_worker(processes: int = 1) -> None:
+    global _agent
+    load_dotenv()
+    # Worker processes share the host's NCBI budget instead of each using all of it
+    PubMedAPI.configure_rate_limit(processes)
+    _agent = PharmaAgent()
+
+
+def _ping() -> int:
+    """Health probe: succeeds only once the worker's initializer has run."""
+    return os.getpid()
+
+
+def run_job(kind: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Execute one job inside a worker process and return a JSON-serializable result."""
+    if kind == "search":
+        results = _agent.search_and_analyze(payload["query"], top_k=payload.get("top_k"))
+        if isinstance(results, str): # No-results message
+            return {"studies": [], "message": results}
+        return {"studies": [s.model_dump(exclude={"raw_data"}) for s in results]}
+    if kind == "question":
+        context = _context_for(payload["studies"])
+        context.history.clear()
+        context.history.extend(payload.get("history", []))
+        return {"answer": _agent.answer_question(context.studies, payload["question"], context=context)}
+    raise ValueError(f"Unknown job kind: {kind}")
+
+
+def _context_for(studies: List[Dict[str, Any]]) -> StudyContext:
+    key = hashlib.sha256(json.dumps(studies, sort_keys=True).encode("utf-8")).hexdigest()
+    if key in _contexts:
+        _contexts.move_to_end(key)
+    else:
+        _contexts[key] = StudyContext([Study(**s) for s in studies])
+        while len(_contexts) > MAX_CONTEXTS:
+            _contexts.popitem(last=False)
+    return _contexts[key]
+
+
+class WorkerPool:
+    """
+    Pulls jobs from a JobQueue and runs them on a pool of worker processes.
+    Only claims a job when a process is free, so unclaimed work stays in the
+    queue where other nodes sharing the backend can pick it up.
+    """
+
+    def __init__(self, queue: JobQueue, workers: int = 4, tenant_limit: int = 2,
+                 poll_interval: float = 0.2, node_id: Optional[str] = None, startup_timeout: float = 120):
+        self.queue = queue
+        self.workers = workers
+        self.tenant_limit = tenant_limit
+        self.poll_interval = poll_interval
+        self.startup_timeout = startup_timeout
+        self.node_id = node_id or f"{socket.gethostname()}-{os.getpid()}"
+        self._slots = threading.BoundedSemaphore(workers)
+        self._stop = threading.Event()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._dispatcher: Optional[threading.Thread] = None
+        self._broken = threading.Event()
+        self._running: set = set() # Job ids currently executing on this node
+        self._running_lock = threading.Lock()
+        self._housekeeper: Optional[threading.Thread] = None
+        self.failed = False # Set when the pool stopped itself because workers could not be restarted
+
+    def start(self) -> None:
+        """Start the worker processes and, once they are confirmed healthy, the dispatcher."""
+        self._executor = self._start_executor()
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name="job-dispatcher", daemon=True)
+        self._dispatcher.start()
+        self._housekeeper = threading.Thread(target=self._housekeeping_loop, name="job-heartbeat", daemon=True)
+        self._housekeeper.start()
+        logging.info(f"Worker pool {self.node_id} started with {self.workers} processes")
+
+    def _start_executor(self) -> ProcessPoolExecutor:
+        """
+        Spawn the processes and wait for every one to finish `_init_worker`.
+        Raises if they can't start (e.g. missing OPENAI_API_KEY), so the node never
+        claims jobs it can't run.
+        """
+        executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.workers,),
+        )
+        try:
+            for probe in [executor.submit(_ping) for _ in range(self.workers)]:
+                probe.result(timeout=self.startup_timeout)
+        except Exception as e:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise RuntimeError(f"Worker processes failed to start: {e!r}") from e
+        return executor
+
+    def join(self) -> None:
+        """Block until the pool is stopped (by `stop`, or by itself on failure; see `failed`)."""
+        self._stop.wait()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._dispatcher:
+            self._dispatcher.join()
+        if self._housekeeper:
+            self._housekeeper.join()
+        if self._executor:
+            self._executor.shutdown(wait=True)
+
+    def _dispatch_loop(self) -> None:
+        while not self._stop.is_set():
+            if self._broken.is_set() and not self._rebuild():
+                break
+            if not self._slots.acquire(timeout=self.poll_interval):
+                continue
+            if self._broken.is_set():
+                self._slots.release()
+                continue
+            try:
+                job = self.queue.claim(self.node_id, self.tenant_limit)
+            except Exception as e:
+                logging.error(f"Error claiming job: {e}")
+                job = None
+            if job is None:
+                self._slots.release()
+                time.sleep(self.poll_interval)
+                continue
+            try:
+                future = self._executor.submit(run_job, job.kind, job.payload)
+            except Exception as e:
+                # Pool broke between the health check and the claim; hand the job back
+                self._broken.set()
+                self._slots.release()
+                self.queue.requeue(job.id, str(e))
+                continue
+            with self._running_lock:
+                self._running.add(job.id)
+            future.add_done_callback(lambda f, job=job: self._on_done(job, f))
+
+    def _housekeeping_loop(self) -> None:
+        """Renew leases on running jobs well before they expire, and purge old finished jobs."""
+        interval = self.queue.lease_seconds / 3
+        while not self._stop.wait(interval):
+            with self._running_lock:
+                job_ids = list(self._running)
+            try:
+                self.queue.heartbeat(self.node_id, job_ids)
+                purged = self.queue.purge_finished()
+                if purged:
+                    logging.info(f"Purged {purged} finished jobs")
+            except Exception as e:
+                logging.error(f"Job queue housekeeping failed: {e}")
+
+    def _rebuild(self) -> bool:
+        """
+        Replace a broken executor once all in-flight jobs have settled.
+        If the replacement can't start either, stop claiming and shut the node down.
+        """
+        for _ in range(self.workers): # Wait for in-flight callbacks to release their slots
+            self._slots.acquire()
+        try:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            logging.warning(f"Worker pool {self.node_id}: a worker process died, restarting the pool")
+            try:
+                self._executor = self._start_executor()
+            except RuntimeError as e:
+                logging.error(f"Worker pool {self.node_id}: {e}; no longer claiming jobs")
+                self.failed = True
+                self._stop.set()
+                return False
+            self._broken.clear()
+            return True
+        finally:
+            for _ in range(self.workers):
+                self._slots.release()
+
+    def _on_done(self, job: Job, future: Future) -> None:
+        try:
+            self.queue.complete(job.id, future.result())
+        except BrokenProcessPool as e:
+            # The job may not be at fault (another job can take the process down with it),
+            # so retry it elsewhere until it has used up its attempts
+            logging.error(f"Job {job.id} lost its worker process: {e}")
+            self._broken.set()
+            self.queue.requeue(job.id, f"Worker process died: {e}")
+        except Exception as e:
+            logging.error(f"Job {job.id} failed: {e}")
+            self.queue.fail(job.id, str(e))
+        finally:
+            with self._running_lock:
+                self._running.discard(job.id)
+            self._slots.release()
@@ -8,6 +8,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from agent.core import PharmaAgent
 import importlib
 import agent.core
+from agent.context import StudyContext
 
 # Force reload of core module to pick up changes
 importlib.reload(agent.core)
@@ -50,8 +51,14 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Initialize Agent
+# With PHARMA_SERVICE_URL set, the UI is a thin client of the job service
+# (python -m service); otherwise it runs the agent in-process.
 @st.cache_resource
 def get_agent_chat_kv6():
+    service_url = os.getenv("PHARMA_SERVICE_URL")
+    if service_url:
+        from service.client import ServiceClient
+        return ServiceClient(service_url, tenant=os.getenv("PHARMA_TENANT", "default"))
     try:
         importlib.reload(agent.core) # Double check reload here
         from agent.core import PharmaAgent
@@ -69,6 +76,8 @@ if 'results_html' not in st.session_state:
     st.session_state.results_html = ""
 if 'chat_message_history' not in st.session_state: 
     st.session_state.chat_message_history = [] 
+if 'chat_context' not in st.session_state:
+    st.session_state.chat_context = None
 
 query = st.text_input("Enter your research question (e.g., 'NSCLC KRAS G12C inhibitors biomarkers'):")
 search_button = st.button("Search & Analyze")
@@ -91,6 +100,8 @@ if search_button and query:
             # Get Results (List[Study])
             results_list = agent.search_and_analyze(query)
             st.session_state.studies = results_list
+            # Serialize the chat context once per result set; every follow-up turn reuses it
+            st.session_state.chat_context = StudyContext(results_list) if results_list else None
             
             progress_bar.progress(80)
             status_text.text("Finalizing analysis and formatting...")
@@ -117,6 +128,7 @@ if search_button and query:
         except Exception as e:
             st.error(f"An error occurred during analysis: {e}")
             st.session_state.studies = []
+            st.session_state.chat_context = None
 
 # --- Persistent Display of Results ---
 if st.session_state.results_html:
@@ -147,7 +159,7 @@ if st.session_state.studies:
         # Get Bot Response
         with st.chat_message("assistant"):
             with st.spinner("Analyzing studies..."):
-                response = agent.answer_question(st.session_state.studies, prompt)
+                response = agent.answer_question(st.session_state.studies, prompt, context=st.session_state.chat_context)
                 st.markdown(response)
         
         # Add Bot Response